@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
 from typing import List, Optional
@@ -16,6 +17,13 @@ from dbcat.migrations import get_alembic_config
 
 LOGGER = logging.getLogger(__name__)
 
+# Extraction waits on the source databases, so the pool is not limited by the
+# number of CPUs. The cap bounds the connections opened at the same time.
+MAX_SCAN_WORKERS = 8
+
+# Use the libyaml bindings when PyYAML was built with them
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 class OutputFormat(str, Enum):
     tabular = "tabular"
@@ -61,7 +69,7 @@ def catalog_connection(
 
 
 def catalog_connection_yaml(config: str) -> Catalog:
-    config_yaml = yaml.safe_load(config)
+    config_yaml = yaml.load(config, Loader=YAML_LOADER)
     LOGGER.debug("Open Catalog from config")
     if "path" in config_yaml and config_yaml["path"] is not None:
         config_yaml["path"] = Path(config_yaml["path"])
@@ -126,8 +134,8 @@ def scan_sources(
             sources = catalog.get_sources()
 
         LOGGER.info("%d sources will be scanned", len(sources))
-        for source in sources:
-            scanner = DbScanner(
+        scanners = [
+            DbScanner(
                 catalog,
                 source,
                 include_schema_regex_str=include_schema_regex,
@@ -135,11 +143,25 @@ def scan_sources(
                 include_table_regex_str=include_table_regex,
                 exclude_table_regex_str=exclude_table_regex,
             )
-            LOGGER.info("Scanning {}".format(scanner.name))
-            try:
-                scanner.scan()
-            except StopIteration:
-                raise NoMatchesError
+            for source in sources
+        ]
+        if len(scanners) == 0:
+            return
+
+        # Reading metadata from the sources is I/O bound and independent per
+        # source. The catalog session is not thread-safe, so the extracted
+        # records are written from this thread, in the order of the sources so
+        # that the ids in the catalog do not depend on which source is fastest.
+        with ThreadPoolExecutor(
+            max_workers=min(len(scanners), MAX_SCAN_WORKERS)
+        ) as executor:
+            futures = [executor.submit(scanner.extract) for scanner in scanners]
+            for scanner, future in zip(scanners, futures):
+                LOGGER.info("Scanning {}".format(scanner.name))
+                try:
+                    scanner.scan(future.result())
+                except StopIteration:
+                    raise NoMatchesError
 
 
 def add_sqlite_source(
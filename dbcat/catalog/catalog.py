@@ -2,9 +2,18 @@ import datetime
 import logging
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
-from typing import Any, Dict, List, Optional
-
-from sqlalchemy import TIMESTAMP, create_engine, desc, func, update
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import (
+    TIMESTAMP,
+    bindparam,
+    create_engine,
+    desc,
+    func,
+    tuple_,
+    update,
+)
+from sqlalchemy.ext import baked
 from sqlalchemy.orm import Query, Session, scoped_session, sessionmaker
 
 from dbcat.catalog.models import (
@@ -24,6 +33,26 @@ from dbcat.catalog.pii_types import PiiType
 
 logger = logging.getLogger("dbcat.Catalog")
 
+# Caches the compiled SQL of the search_* queries. Patterns are bound as
+# parameters so that every call with the same set of filters hits the cache.
+bakery = baked.bakery()
+
+
+def _filter_like(
+    baked_query: baked.BakedQuery, column: Any, pattern: str, param: str
+) -> None:
+    # The column and parameter names are part of the cache key as the criteria
+    # below are shared by every search
+    if pattern == "%":
+        # LIKE '%' matches every non-null value, so skip the pattern match
+        baked_query.add_criteria(
+            lambda q: q.filter(column.isnot(None)), str(column), param
+        )
+    else:
+        baked_query.add_criteria(
+            lambda q: q.filter(column.like(bindparam(param))), str(column), param
+        )
+
 
 class Catalog(ABC):
     def __init__(self, **kwargs):
@@ -125,6 +154,13 @@ class Catalog(ABC):
     def add_source(self, name: str, source_type: str, **kwargs) -> CatSource:
         return self._create(CatSource, name=name, source_type=source_type, **kwargs)
 
+    def add_sources(self, sources: List[Dict[str, Any]]) -> None:
+        # Sent as one executemany. Ids are not fetched, so look up the sources
+        # by name if they are needed.
+        self._current_session.bulk_save_objects(
+            [CatSource(**source) for source in sources]
+        )
+
     def add_schema(self, schema_name: str, source: CatSource) -> CatSchema:
         return self._create(CatSchema, name=schema_name, source=source)
 
@@ -179,6 +215,25 @@ class Catalog(ABC):
             create_method_kwargs={"context": context},
         )
 
+    def add_column_lineages(
+        self,
+        edges: List[Tuple[CatColumn, CatColumn, Dict[Any, Any]]],
+        job_execution_id: int,
+    ) -> None:
+        # Sent as one executemany. Ids are not fetched, so query the edges by
+        # job_execution_id if they are needed.
+        self._current_session.bulk_save_objects(
+            [
+                ColumnLineage(
+                    source_id=source.id,
+                    target_id=target.id,
+                    job_execution_id=job_execution_id,
+                    context=context,
+                )
+                for source, target, context in edges
+            ]
+        )
+
     def add_task(self, app_name: str, status: int, message: str) -> Task:
         logger.debug("Added task")
         return self._create(
@@ -186,10 +241,10 @@ class Catalog(ABC):
         )
 
     def get_source(self, source_name: str) -> CatSource:
+        baked_query = bakery(lambda session: session.query(CatSource))
+        baked_query += lambda q: q.filter(CatSource.name == bindparam("source_name"))
         return (
-            self._current_session.query(CatSource)
-            .filter(CatSource.name == source_name)
-            .one()
+            baked_query(self._current_session()).params(source_name=source_name).one()
         )
 
     def get_schema(self, source_name: str, schema_name: str) -> CatSchema:
@@ -252,6 +307,24 @@ class Catalog(ABC):
             .one()
         )
 
+    def get_columns(
+        self, fqdns: Iterable[Tuple[str, str, str, str]]
+    ) -> Dict[Tuple[str, str, str, str], CatColumn]:
+        """Look up many columns by (source, schema, table, column) in one query"""
+        columns = (
+            self._current_session.query(CatColumn)
+            .join(CatColumn.table)
+            .join(CatTable.schema)
+            .join(CatSchema.source)
+            .filter(
+                tuple_(
+                    CatSource.name, CatSchema.name, CatTable.name, CatColumn.name
+                ).in_(set(fqdns))
+            )
+            .all()
+        )
+        return {column.fqdn: column for column in columns}
+
     def get_job(self, name: str) -> Job:
         return self._current_session.query(Job).filter(Job.name == name).one()
 
@@ -374,21 +447,28 @@ class Catalog(ABC):
         )
 
     def search_sources(self, source_like: str) -> List[CatSource]:
+        baked_query = bakery(lambda session: session.query(CatSource))
+        _filter_like(baked_query, CatSource.name, source_like, "source_like")
         return (
-            self._current_session.query(CatSource)
-            .filter(CatSource.name.like(source_like))
-            .all()
+            baked_query(self._current_session()).params(source_like=source_like).all()
         )
 
     def search_schema(
         self, schema_like: str, source_like: Optional[str] = None
     ) -> List[CatSchema]:
-        stmt = self._current_session.query(CatSchema)
+        baked_query = bakery(lambda session: session.query(CatSchema))
         if source_like is not None:
-            stmt = stmt.join(CatSchema.source).filter(CatSource.name.like(source_like))
-        stmt = stmt.filter(CatSchema.name.like(schema_like))
-        logger.debug(str(stmt))
-        return stmt.all()
+            baked_query += lambda q: q.join(CatSchema.source)
+            _filter_like(baked_query, CatSource.name, source_like, "source_like")
+        _filter_like(baked_query, CatSchema.name, schema_like, "schema_like")
+        logger.debug(
+            "Search schema: schema_like=%s, source_like=%s", schema_like, source_like
+        )
+        return (
+            baked_query(self._current_session())
+            .params(schema_like=schema_like, source_like=source_like)
+            .all()
+        )
 
     def search_tables(
         self,
@@ -396,17 +476,29 @@ class Catalog(ABC):
         schema_like: Optional[str] = None,
         source_like: Optional[str] = None,
     ) -> List[CatTable]:
-        stmt = self._current_session.query(CatTable)
+        baked_query = bakery(lambda session: session.query(CatTable))
         if source_like is not None or schema_like is not None:
-            stmt = stmt.join(CatTable.schema)
+            baked_query += lambda q: q.join(CatTable.schema)
         if source_like is not None:
-            stmt = stmt.join(CatSchema.source).filter(CatSource.name.like(source_like))
+            baked_query += lambda q: q.join(CatSchema.source)
+            _filter_like(baked_query, CatSource.name, source_like, "source_like")
         if schema_like is not None:
-            stmt = stmt.filter(CatSchema.name.like(schema_like))
+            _filter_like(baked_query, CatSchema.name, schema_like, "schema_like")
 
-        stmt = stmt.filter(CatTable.name.like(table_like))
-        logger.debug(str(stmt))
-        return stmt.all()
+        _filter_like(baked_query, CatTable.name, table_like, "table_like")
+        logger.debug(
+            "Search tables: table_like=%s, schema_like=%s, source_like=%s",
+            table_like,
+            schema_like,
+            source_like,
+        )
+        return (
+            baked_query(self._current_session())
+            .params(
+                table_like=table_like, schema_like=schema_like, source_like=source_like
+            )
+            .all()
+        )
 
     def search_table(
         self,
@@ -431,20 +523,30 @@ class Catalog(ABC):
         schema_like: Optional[str] = None,
         source_like: Optional[str] = None,
     ) -> List[CatColumn]:
-        stmt = self._current_session.query(CatColumn)
+        baked_query = bakery(lambda session: session.query(CatColumn))
         if source_like is not None or schema_like is not None or table_like is not None:
-            stmt = stmt.join(CatColumn.table)
+            baked_query += lambda q: q.join(CatColumn.table)
         if source_like is not None or schema_like is not None:
-            stmt = stmt.join(CatTable.schema)
+            baked_query += lambda q: q.join(CatTable.schema)
         if source_like is not None:
-            stmt = stmt.join(CatSchema.source).filter(CatSource.name.like(source_like))
+            baked_query += lambda q: q.join(CatSchema.source)
+            _filter_like(baked_query, CatSource.name, source_like, "source_like")
         if schema_like is not None:
-            stmt = stmt.filter(CatSchema.name.like(schema_like))
+            _filter_like(baked_query, CatSchema.name, schema_like, "schema_like")
         if table_like is not None:
-            stmt = stmt.filter(CatTable.name.like(table_like))
+            _filter_like(baked_query, CatTable.name, table_like, "table_like")
 
-        stmt = stmt.filter(CatColumn.name.like(column_like))
-        return stmt.all()
+        _filter_like(baked_query, CatColumn.name, column_like, "column_like")
+        return (
+            baked_query(self._current_session())
+            .params(
+                column_like=column_like,
+                table_like=table_like,
+                schema_like=schema_like,
+                source_like=source_like,
+            )
+            .all()
+        )
 
     def update_source(
         self, source: CatSource, default_schema: CatSchema
@@ -499,7 +601,12 @@ class PGCatalog(Catalog):
                     port=self.port,
                     database=self.database,
                 ),
-                **self._connection_args
+                **{
+                    # Send bulk inserts as multi-row INSERT .. VALUES through
+                    # psycopg2's execute_values rather than one INSERT per row
+                    "executemany_mode": "values",
+                    **self._connection_args,
+                }
             )
         return self._engine
 
@@ -1,3 +1,4 @@
+import functools
 import logging
 import re
 from contextlib import closing
@@ -29,6 +30,13 @@ from dbcat.catalog.sqlite_extractor import SqliteMetadataExtractor
 LOGGER = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _sqlalchemy_conn_string_key() -> str:
+    # Connection string key relative to an extractor's scope. Reading the scope
+    # needs a SQLAlchemyExtractor instance, so build the key on first use only.
+    return f"{SQLAlchemyExtractor().get_scope()}.{SQLAlchemyExtractor.CONN_STRING}"
+
+
 class DbScanner:
     def __init__(
         self,
@@ -126,72 +134,77 @@ class DbScanner:
             record = extractor.extract()
         return None
 
-    def scan(self):
+    def extract(self) -> List[TableMetadata]:
+        # Only reads from the source database, so extraction of different
+        # sources can run in parallel while writes to the catalog stay serial.
+        with closing(self._extractor) as extractor:
+            extractor.init(Scoped.get_scoped_conf(self._conf, extractor.get_scope()))
+            return list(self._filter_rows(extractor))
+
+    def scan(self, records: Optional[List[TableMetadata]] = None):
+        if records is None:
+            records = self.extract()
+
         schema_count = 0
         table_count = 0
         column_count = 0
-        with closing(self._extractor) as extractor:
-            extractor.init(Scoped.get_scoped_conf(self._conf, extractor.get_scope()))
+        rows = iter(records)
+        record: TableMetadata = next(rows)
+        try:
+            current_schema = self._catalog.get_schema(
+                source_name=self._source.name, schema_name=record.schema
+            )
+        except NoResultFound:
+            current_schema = self._catalog.add_schema(
+                schema_name=record.schema, source=self._source
+            )
+        current_schema_name = record.schema
+        schema_count += 1
+        LOGGER.info(f"Start extraction of schema {record.schema}")
+        while record:
+            LOGGER.debug(record)
+            if record.schema != current_schema_name:
+                LOGGER.debug(f"Total tables extracted: {table_count}")
+                try:
+                    current_schema = self._catalog.get_schema(
+                        source_name=self._source.name, schema_name=record.schema
+                    )
+                except NoResultFound:
+                    current_schema = self._catalog.add_schema(
+                        schema_name=record.schema, source=self._source
+                    )
+                current_schema_name = record.schema
+                LOGGER.debug(f"Start extraction of schema {record.schema}")
+                schema_count += 1
 
-            record: TableMetadata = next(self._filter_rows(extractor))
             try:
-                current_schema = self._catalog.get_schema(
-                    source_name=self._source.name, schema_name=record.schema
+                table = self._catalog.get_table(
+                    source_name=self._source.name,
+                    schema_name=current_schema_name,
+                    table_name=record.name,
                 )
+                existing_columns = {
+                    c.name for c in self._catalog.get_columns_for_table(table)
+                }
             except NoResultFound:
-                current_schema = self._catalog.add_schema(
-                    schema_name=record.schema, source=self._source
+                table = self._catalog.add_table(
+                    table_name=record.name, schema=current_schema
                 )
-            schema_count += 1
-            LOGGER.info(f"Start extraction of schema {record.schema}")
-            while record:
-                LOGGER.debug(record)
-                if record.schema != current_schema.name:
-                    LOGGER.debug(f"Total tables extracted: {table_count}")
-                    try:
-                        current_schema = self._catalog.get_schema(
-                            source_name=self._source.name, schema_name=record.schema
-                        )
-                    except NoResultFound:
-                        current_schema = self._catalog.add_schema(
-                            schema_name=record.schema, source=self._source
-                        )
-                    LOGGER.debug(f"Start extraction of schema {record.schema}")
-                    schema_count += 1
-
-                try:
-                    table = self._catalog.get_table(
-                        source_name=self._source.name,
-                        schema_name=current_schema.name,
-                        table_name=record.name,
-                    )
-                except NoResultFound:
-                    table = self._catalog.add_table(
-                        table_name=record.name, schema=current_schema
+                existing_columns = set()
+            table_count += 1
+            for index, c in enumerate(record.columns):
+                if c.name not in existing_columns:
+                    self._catalog.add_column(
+                        column_name=c.name,
+                        data_type=c.type,
+                        sort_order=index,
+                        table=table,
                     )
-                table_count += 1
-                index = 0
-                for c in record.columns:
-                    try:
-                        self._catalog.get_column(
-                            source_name=self._source.name,
-                            schema_name=current_schema.name,
-                            table_name=table.name,
-                            column_name=c.name,
-                        )
-                    except NoResultFound:
-                        self._catalog.add_column(
-                            column_name=c.name,
-                            data_type=c.type,
-                            sort_order=index,
-                            table=table,
-                        )
-                    index += 1
-                    column_count += 1
-                try:
-                    record = next(self._filter_rows(extractor))
-                except StopIteration:
-                    record = None
+            column_count += len(record.columns)
+            try:
+                record = next(rows)
+            except StopIteration:
+                record = None
 
         LOGGER.info(
             "Scanned {} schemata, {} tables, {} columns".format(
@@ -207,7 +220,7 @@ class DbScanner:
     ) -> Tuple[BasePostgresMetadataExtractor, Any]:
         extractor = extractorClass()
         scope = extractor.get_scope()
-        conn_string_key = f"{scope}.{SQLAlchemyExtractor().get_scope()}.{SQLAlchemyExtractor.CONN_STRING}"
+        conn_string_key = f"{scope}.{_sqlalchemy_conn_string_key()}"
 
         conf = ConfigFactory.from_dict(
             {
@@ -252,7 +265,7 @@ class DbScanner:
 
         extractor = MysqlMetadataExtractor()
         scope = extractor.get_scope()
-        conn_string_key = f"{scope}.{SQLAlchemyExtractor().get_scope()}.{SQLAlchemyExtractor.CONN_STRING}"
+        conn_string_key = f"{scope}.{_sqlalchemy_conn_string_key()}"
 
         conf = ConfigFactory.from_dict(
             {
@@ -289,7 +302,7 @@ class DbScanner:
     ) -> Tuple[SnowflakeMetadataExtractor, Any]:
         extractor = SnowflakeMetadataExtractor()
         scope = extractor.get_scope()
-        conn_string_key = f"{scope}.{SQLAlchemyExtractor().get_scope()}.{SQLAlchemyExtractor.CONN_STRING}"
+        conn_string_key = f"{scope}.{_sqlalchemy_conn_string_key()}"
 
         conf = ConfigFactory.from_dict(
             {
@@ -308,7 +321,7 @@ class DbScanner:
     ) -> Tuple[AthenaMetadataExtractor, Any]:
         extractor = AthenaMetadataExtractor()
         scope = extractor.get_scope()
-        conn_string_key = f"{scope}.{SQLAlchemyExtractor().get_scope()}.{SQLAlchemyExtractor.CONN_STRING}"
+        conn_string_key = f"{scope}.{_sqlalchemy_conn_string_key()}"
 
         conf = ConfigFactory.from_dict(
             {
@@ -327,7 +340,7 @@ class DbScanner:
     ) -> Tuple[SqliteMetadataExtractor, Any]:
         extractor = SqliteMetadataExtractor()
         scope = extractor.get_scope()
-        conn_string_key = f"{scope}.{SQLAlchemyExtractor().get_scope()}.{SQLAlchemyExtractor.CONN_STRING}"
+        conn_string_key = f"{scope}.{_sqlalchemy_conn_string_key()}"
         conf = ConfigFactory.from_dict(
             {
                 conn_string_key: source.conn_string,
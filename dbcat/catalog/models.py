@@ -10,6 +10,7 @@ from sqlalchemy import (
     Column,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     TypeDecorator,
@@ -223,7 +224,10 @@ class CatSchema(BaseModel):
     source = relationship("CatSource", back_populates="schemata", lazy="joined")
     tables = relationship("CatTable", back_populates="schema")
 
-    __table_args__ = (UniqueConstraint("source_id", "name", name="unique_schema_name"),)
+    __table_args__ = (
+        UniqueConstraint("source_id", "name", name="unique_schema_name"),
+        Index("ix_schemata_name", "name", postgresql_ops={"name": "text_pattern_ops"}),
+    )
 
     @property
     def fqdn(self):
@@ -259,7 +263,10 @@ class CatTable(BaseModel):
         "CatColumn", back_populates="table", order_by="CatColumn.sort_order"
     )
 
-    __table_args__ = (UniqueConstraint("schema_id", "name", name="unique_table_name"),)
+    __table_args__ = (
+        UniqueConstraint("schema_id", "name", name="unique_table_name"),
+        Index("ix_tables_name", "name", postgresql_ops={"name": "text_pattern_ops"}),
+    )
 
     @property
     def fqdn(self):
@@ -310,7 +317,10 @@ class CatColumn(BaseModel):
     table_id = Column(Integer, ForeignKey("tables.id"))
     table = relationship("CatTable", back_populates="columns", lazy="joined")
 
-    __table_args__ = (UniqueConstraint("table_id", "name", name="unique_column_name"),)
+    __table_args__ = (
+        UniqueConstraint("table_id", "name", name="unique_column_name"),
+        Index("ix_columns_name", "name", postgresql_ops={"name": "text_pattern_ops"}),
+    )
 
     @property
     def fqdn(self):
@@ -85,6 +85,16 @@ class SqliteMetadataExtractor(Extractor):
         self._alchemy_extractor.init(sql_alch_conf)
         self._extract_iter: Union[None, Iterator] = None
 
+    def close(self) -> None:
+        # SQLAlchemyExtractor keeps its connection open. Close it and dispose of
+        # its engine in the thread that opened it, as SQLite connections cannot
+        # be reset or closed from another thread. There is none if init failed.
+        alchemy_extractor = getattr(self, "_alchemy_extractor", None)
+        connection = getattr(alchemy_extractor, "connection", None)
+        if connection is not None:
+            connection.close()
+            connection.engine.dispose()
+
     def extract(self) -> Union[TableMetadata, None]:
         if not self._extract_iter:
             self._extract_iter = self._get_extract_iter()
@@ -1,7 +1,19 @@
+import functools
 import logging
+import operator
 import re
 from collections import namedtuple
-from typing import Generator, List, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 from dbcat.catalog import Catalog, CatSchema, CatSource, CatTable
 
@@ -10,33 +22,127 @@ LOGGER = logging.getLogger(__name__)
 CatalogObject = namedtuple("CatalogObject", ["name", "id"])
 
 
+_name_and_id = operator.attrgetter("name", "id")
+
+
+def to_catalog_objects(rows: Iterable[Any]) -> Iterator[CatalogObject]:
+    """Lazily convert catalog rows such as schemata or tables to CatalogObjects"""
+    return map(CatalogObject._make, map(_name_and_id, rows))
+
+
 class NoMatchesError(Exception):
     """Raise Exception if schema/table/column generators do not find any matches"""
 
     message = "No columns were scanned. Ensure include/exclude patterns are correct OR no new columns have been added"
 
 
-def filter_objects(
+_INLINE_FLAGS = re.compile(r"\(\?[aiLmsux]")
+_LITERAL = re.compile(r"[A-Za-z0-9_]+")
+_LITERAL_PREFIX = re.compile(r"[A-Za-z0-9_]*")
+
+
+def _optimize_alternation(expressions: Tuple[str, ...]) -> str:
+    # Build a trie of the literal prefixes so that patterns sharing a prefix are
+    # matched once, e.g. full_pii.*|full_name -> full_(?:pii.*|name)
+    trie: Dict[Optional[str], Any] = {}
+    for exp in expressions:
+        match = _LITERAL_PREFIX.match(exp)
+        prefix = match.group() if match and "|" not in exp else ""
+        if exp[len(prefix) : len(prefix) + 1] in ("*", "+", "?", "{"):
+            # The quantifier binds to the last literal character
+            prefix = prefix[:-1]
+        node = trie
+        # Patterns are compiled with IGNORECASE, so case does not split branches
+        for char in prefix.lower():
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(exp[len(prefix) :])
+
+    def emit(node: Dict[Optional[str], Any]) -> str:
+        alternatives = list(dict.fromkeys(node.get(None, [])))
+        alternatives += [
+            char + emit(node[char])
+            for char in sorted(char for char in node if char is not None)
+        ]
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:{})".format("|".join(alternatives))
+
+    return emit(trie)
+
+
+def _compile_regex(expressions: Tuple[str, ...]) -> List["re.Pattern[str]"]:
+    regexes = [re.compile(exp, re.IGNORECASE) for exp in expressions]
+    # Group numbers would shift once the patterns are joined, and before Python
+    # 3.11 an inline global flag such as (?x) in one pattern would apply to all of
+    # them. Only fuse patterns without either into a single alternation.
+    if (
+        len(regexes) > 1
+        and all(regex.groups == 0 for regex in regexes)
+        and not any(_INLINE_FLAGS.search(exp) for exp in expressions)
+    ):
+        try:
+            return [re.compile(_optimize_alternation(expressions), re.IGNORECASE)]
+        except re.error:
+            pass
+    return regexes
+
+
+def _search_any(regexes: List["re.Pattern[str]"], name: str) -> bool:
+    return any(regex.search(name) for regex in regexes)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(expressions: Tuple[str, ...]) -> Callable[[str], Any]:
+    regexes = _compile_regex(expressions)
+
+    if len(regexes) == 1:
+        # Use the bound method of the fused pattern directly
+        search: Callable[[str], Any] = regexes[0].search
+    else:
+        search = functools.partial(_search_any, regexes)
+
+    literals = tuple(
+        dict.fromkeys(exp.lower() for exp in expressions if _LITERAL.fullmatch(exp))
+    )
+    if not literals:
+        return search
+
+    others = _compile(tuple(exp for exp in expressions if not _LITERAL.fullmatch(exp)))
+
+    def match(name: str) -> bool:
+        # A literal pattern is a case insensitive substring test. Non-ASCII names
+        # go through the regex as str.lower() does not fold case the same way.
+        if not name.isascii():
+            return search(name)
+        lowered = name.lower()
+        return any(literal in lowered for literal in literals) or others(name)
+
+    return match
+
+
+def filter_objects_iter(
     include_regex_str: Optional[List[str]],
     exclude_regex_str: Optional[List[str]],
-    objects: List[CatalogObject],
-) -> List[CatalogObject]:
-    if include_regex_str is not None and len(include_regex_str) > 0:
-        include_regex = [re.compile(exp, re.IGNORECASE) for exp in include_regex_str]
-        matched_set = set()
-        for regex in include_regex:
-            matched_set |= set(
-                list(filter(lambda m: regex.search(m.name) is not None, objects,))
-            )
+    objects: Iterable[CatalogObject],
+) -> Generator[CatalogObject, None, None]:
+    include = _compile(tuple(include_regex_str)) if include_regex_str else None
+    exclude = _compile(tuple(exclude_regex_str)) if exclude_regex_str else None
 
-        objects = list(matched_set)
+    for o in objects:
+        name = o.name
+        if include is not None and not include(name):
+            continue
+        if exclude is not None and exclude(name):
+            continue
+        yield o
 
-    if exclude_regex_str is not None and len(exclude_regex_str) > 0:
-        exclude_regex = [re.compile(exp, re.IGNORECASE) for exp in exclude_regex_str]
-        for regex in exclude_regex:
-            objects = list(filter(lambda m: regex.search(m.name) is None, objects))
 
-    return objects
+def filter_objects(
+    include_regex_str: Optional[List[str]],
+    exclude_regex_str: Optional[List[str]],
+    objects: Iterable[CatalogObject],
+) -> List[CatalogObject]:
+    return list(filter_objects_iter(include_regex_str, exclude_regex_str, objects))
 
 
 def table_generator(
@@ -51,24 +157,22 @@ def table_generator(
     schemata = filter_objects(
         include_schema_regex_str,
         exclude_schema_regex_str,
-        [
-            CatalogObject(s.name, s.id)
-            for s in catalog.search_schema(source_like=source.name, schema_like="%")
-        ],
+        to_catalog_objects(
+            catalog.search_schema(source_like=source.name, schema_like="%")
+        ),
     )
 
     for schema_object in schemata:
         schema = catalog.get_schema_by_id(schema_object.id)
         LOGGER.info("Generating schema %s", schema.name)
-        table_objects = filter_objects(
+        table_objects = filter_objects_iter(
             include_table_regex_str,
             exclude_table_regex_str,
-            [
-                CatalogObject(t.name, t.id)
-                for t in catalog.search_tables(
+            to_catalog_objects(
+                catalog.search_tables(
                     source_like=source.name, schema_like=schema.name, table_like="%"
                 )
-            ],
+            ),
         )
 
         for table_object in table_objects:
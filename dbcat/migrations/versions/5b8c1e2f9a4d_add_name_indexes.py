@@ -0,0 +1,30 @@
+"""add name indexes
+
+Revision ID: 5b8c1e2f9a4d
+Revises: 0fed90ee2030
+Create Date: 2026-10-16 10:12:41.204318
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b8c1e2f9a4d"
+down_revision = "0fed90ee2030"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # text_pattern_ops lets PostgreSQL use the index for prefix LIKE searches
+    for table in ["schemata", "tables", "columns"]:
+        op.create_index(
+            "ix_{}_name".format(table),
+            table,
+            ["name"],
+            postgresql_ops={"name": "text_pattern_ops"},
+        )
+
+
+def downgrade():
+    for table in ["schemata", "tables", "columns"]:
+        op.drop_index("ix_{}_name".format(table), table_name=table)
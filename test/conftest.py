@@ -1,43 +1,121 @@
 import logging
 import os
+import socket
 import sqlite3
-from contextlib import closing
+from contextlib import closing, contextmanager
+from io import StringIO
+from itertools import chain
 from shutil import rmtree
-from typing import Any, Generator, Tuple
+from typing import Generator, Tuple
 
 import psycopg2
 import pymysql
 import pytest
+from pymysql.constants import CLIENT
 from pytest_cases import fixture, parametrize_with_cases
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, selectinload, sessionmaker
 from sqlalchemy.orm.exc import NoResultFound
 
 from dbcat import settings
-from dbcat.api import catalog_connection_yaml, init_db, scan_sources
-from dbcat.catalog import CatSource
+from dbcat.api import (
+    catalog_connection,
+    catalog_connection_yaml,
+    init_db,
+    scan_sources,
+)
+from dbcat.catalog import CatColumn, CatSchema, CatSource, CatTable
 from dbcat.catalog.catalog import Catalog
+from dbcat.catalog.models import DefaultSchema
 
-postgres_conf = """
-catalog:
-  user: piiuser
-  password: p11secret
-  host: {host}
-  port: 5432
-  database: piidb
-  secret: {secret}
-"""
+postgres_conf = {
+    "user": "piiuser",
+    "password": "p11secret",
+    "port": 5432,
+    "database": "piidb",
+    "secret": settings.DEFAULT_CATALOG_SECRET,
+}
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def root_connection(request):
-    conf = postgres_conf.format(
-        host=request.config.getoption("--pg-host"),
-        secret=settings.DEFAULT_CATALOG_SECRET,
-    )
-    with closing(catalog_connection_yaml(conf)) as conn:
+    if not request.config.has_pg:
+        pytest.skip("PostgreSQL at --pg-host is not reachable")
+    with closing(
+        catalog_connection(host=request.config.getoption("--pg-host"), **postgres_conf)
+    ) as conn:
         yield conn
 
 
+@pytest.fixture
+def count_queries():
+    # Records the statements sent on a session's bind so that tests can put an
+    # upper bound on the number of queries, e.g. to catch N+1 lazy loads.
+    @contextmanager
+    def count(session):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        bind = session.get_bind()
+        event.listen(bind, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+    return count
+
+
+@pytest.fixture(scope="session")
+def bind_catalog():
+    # Runs a catalog's sessions on an external connection, e.g. one inside a
+    # transaction that the fixture rolls back, and restores the original
+    # session factory on exit.
+    @contextmanager
+    def bind(catalog: Catalog, connection):
+        assert catalog._current_session is None, "Cannot rebind inside a session"
+        original = catalog._scoped_session
+        catalog._scoped_session = scoped_session(sessionmaker(bind=connection))
+        try:
+            yield catalog
+        finally:
+            catalog._scoped_session.remove()
+            catalog._scoped_session = original
+
+    return bind
+
+
+@pytest.fixture(scope="session")
+def run_asserts():
+    # Checks that a scanned source has the schema, tables and columns that
+    # pii_data_load creates. The tree is eager loaded in one query per level.
+    def check(catalog: Catalog, source_name: str):
+        with catalog.managed_session as session:
+            source = (
+                session.query(CatSource)
+                .options(
+                    selectinload(CatSource.schemata)
+                    .selectinload(CatSchema.tables)
+                    .selectinload(CatTable.columns)
+                )
+                .filter(CatSource.name == source_name)
+                .one()
+            )
+
+            schemata = source.schemata
+            assert len(schemata) == 1
+
+            tables = schemata[0].tables
+            assert len(tables) == 3
+
+            columns = list(chain.from_iterable(table.columns for table in tables))
+            assert len(columns) == 6
+
+    return check
+
+
 sqlite_catalog_conf = """
 catalog:
   path: {path}
@@ -46,13 +124,14 @@ catalog:
 
 
 @fixture(scope="module")
-def temp_sqlite_path(tmpdir_factory):
-    temp_dir = tmpdir_factory.mktemp("sqlite_test")
-    sqlite_path = temp_dir.join("sqldb")
-
-    yield sqlite_path
-
-    os.remove(sqlite_path)
+def temp_sqlite_path(request):
+    # A shared-cache in-memory database only lives while a connection to it is
+    # open. Hold one for the module as SQLAlchemy does not pool file URIs.
+    sqlite_path = "file:{}?mode=memory&cache=shared&uri=true".format(
+        request.module.__name__
+    )
+    with closing(sqlite3.connect(sqlite_path, uri=True)):
+        yield sqlite_path
 
 
 def case_setup_sqlite(temp_sqlite_path):
@@ -83,36 +162,64 @@ def pytest_addoption(parser):
     )
 
 
+def is_reachable(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def pytest_configure(config):
+    # With DBCAT_SKIP_UNREACHABLE_DBS=1, probe each database once so that tests
+    # which need a missing database are skipped instead of each one waiting for
+    # a connection timeout. This is opt in and ignored on CI, so that a database
+    # outage fails the run instead of turning it into a run full of skips.
+    skip_unreachable = (
+        os.environ.get("DBCAT_SKIP_UNREACHABLE_DBS") == "1"
+        and not os.environ.get("CI")
+    )
+    config.has_pg = not skip_unreachable or is_reachable(
+        config.getoption("--pg-host"), 5432
+    )
+    config.has_mysql = not skip_unreachable or is_reachable(
+        config.getoption("--mysql-host"), 3306
+    )
+
+
+@pytest.fixture(scope="session")
+def pg_catalog_user(root_connection):
+    with root_connection.engine.connect() as conn:
+        conn.execute("CREATE USER catalog_user PASSWORD 'catal0g_passw0rd'")
+
+    yield "catalog_user"
+
+    with root_connection.engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            "DROP USER catalog_user"
+        )
+
+
 @fixture(scope="module")
-def setup_pg_catalog(request):
-    conf = postgres_conf.format(
+def setup_pg_catalog(request, root_connection, pg_catalog_user):
+    with root_connection.engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            "CREATE DATABASE tokern"
+        )
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            "GRANT ALL PRIVILEGES ON DATABASE tokern TO catalog_user"
+        )
+
+    yield pg_catalog_conf.format(
         host=request.config.getoption("--pg-host"),
         secret=settings.DEFAULT_CATALOG_SECRET,
     )
-    with closing(catalog_connection_yaml(conf)) as root_connection:
-        with root_connection.engine.connect() as conn:
-            conn.execute("CREATE USER catalog_user PASSWORD 'catal0g_passw0rd'")
-            conn.execution_options(isolation_level="AUTOCOMMIT").execute(
-                "CREATE DATABASE tokern"
-            )
-            conn.execution_options(isolation_level="AUTOCOMMIT").execute(
-                "GRANT ALL PRIVILEGES ON DATABASE tokern TO catalog_user"
-            )
 
-        yield pg_catalog_conf.format(
-            host=request.config.getoption("--pg-host"),
-            secret=settings.DEFAULT_CATALOG_SECRET,
+    with root_connection.engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(
+            "DROP DATABASE tokern"
         )
 
-        with root_connection.engine.connect() as conn:
-            conn.execution_options(isolation_level="AUTOCOMMIT").execute(
-                "DROP DATABASE tokern"
-            )
-
-            conn.execution_options(isolation_level="AUTOCOMMIT").execute(
-                "DROP USER catalog_user"
-            )
-
 
 def case_setup_pg(setup_pg_catalog):
     return setup_pg_catalog
@@ -128,20 +235,30 @@ def open_catalog_connection(catalog_conf) -> Generator[Tuple[Catalog, str], None
 
 pii_data_load = [
     "create table no_pii(a text, b text)",
-    "insert into no_pii values ('abc', 'def')",
-    "insert into no_pii values ('xsfr', 'asawe')",
+    "insert into no_pii values ('abc', 'def'), ('xsfr', 'asawe')",
     "create table partial_pii(a text, b text)",
-    "insert into partial_pii values ('917-908-2234', 'plkj')",
-    "insert into partial_pii values ('215-099-2234', 'sfrf')",
+    "insert into partial_pii values ('917-908-2234', 'plkj'), ('215-099-2234', 'sfrf')",
     "create table full_pii(name text, location text)",
-    "insert into full_pii values ('Jonathan Smith', 'Virginia')",
-    "insert into full_pii values ('Chase Ryan', 'Chennai')",
+    "insert into full_pii values ('Jonathan Smith', 'Virginia'), ('Chase Ryan', 'Chennai')",
 ]
 
-pii_data_drop = ["DROP TABLE full_pii", "DROP TABLE partial_pii", "DROP TABLE no_pii"]
+# Single round-trip versions for raw DBAPI connections that accept
+# multiple statements (psycopg2, pymysql with MULTI_STATEMENTS, sqlite3 scripts)
+pii_data_load_script = ";\n".join(pii_data_load)
+pii_data_drop_script = "DROP TABLE IF EXISTS full_pii, partial_pii, no_pii"
 
+# The rows of pii_data_load as CSV, for COPY FROM STDIN on PostgreSQL
+pii_data_create_script = ";\n".join(
+    statement for statement in pii_data_load if statement.startswith("create")
+)
+pii_data_csv = {
+    "no_pii": "abc,def\nxsfr,asawe\n",
+    "partial_pii": "917-908-2234,plkj\n215-099-2234,sfrf\n",
+    "full_pii": "Jonathan Smith,Virginia\nChase Ryan,Chennai\n",
+}
 
-@pytest.fixture(scope="module")
+
+@pytest.fixture(scope="session")
 def temp_sqlite_db(tmpdir_factory):
     temp_dir = tmpdir_factory.mktemp("sqlite_extractor")
     sqlite_path = temp_dir.join("sqldb")
@@ -157,7 +274,11 @@ def temp_sqlite_db(tmpdir_factory):
 def mysql_conn(host):
     return (
         pymysql.connect(
-            host=host, user="piiuser", password="p11secret", database="piidb",
+            host=host,
+            user="piiuser",
+            password="p11secret",
+            database="piidb",
+            client_flag=CLIENT.MULTI_STATEMENTS,
         ),
         "piidb",
     )
@@ -173,39 +294,95 @@ def pg_conn(host):
 
 
 def sqlite_conn(path: str):
-    return sqlite3.connect(path), path
+    return sqlite3.connect(path, isolation_level=None), path
 
 
-@pytest.fixture(scope="module")
-def load_all_data(temp_sqlite_db, request):
-    logging.info("Load data")
-    params = [
-        mysql_conn(request.config.getoption("--mysql-host")),
-        pg_conn(request.config.getoption("--pg-host")),
-    ]
-    for p in params:
-        db_conn, expected_schema = p
+@pytest.fixture(scope="session")
+def db_pool(request):
+    connections = {}
+
+    def connect(vendor: str):
+        if vendor == "mysql" and not request.config.has_mysql:
+            pytest.skip("MySQL at --mysql-host is not reachable")
+        elif vendor == "postgresql" and not request.config.has_pg:
+            pytest.skip("PostgreSQL at --pg-host is not reachable")
+
+        if vendor not in connections:
+            if vendor == "mysql":
+                connections[vendor] = mysql_conn(
+                    request.config.getoption("--mysql-host")
+                )
+            else:
+                connections[vendor] = pg_conn(request.config.getoption("--pg-host"))
+        return connections[vendor]
+
+    yield connect
+
+    for db_conn, expected_schema in connections.values():
+        db_conn.close()
+
+
+def run_script(params, script: str):
+    db_conn, expected_schema = params
+    try:
         with db_conn.cursor() as cursor:
-            for statement in pii_data_load:
-                cursor.execute(statement)
-            cursor.execute("commit")
-
-    with closing(sqlite3.connect(temp_sqlite_db)) as conn:
-        for statement in pii_data_load:
-            conn.execute(statement)
-        conn.commit()
-
-    yield params, temp_sqlite_db
-    for p in params:
-        db_conn, expected_schema = p
+            cursor.execute(script)
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+    return params
+
+
+def load_postgresql(params):
+    db_conn, expected_schema = params
+    try:
         with db_conn.cursor() as cursor:
-            for statement in pii_data_drop:
-                cursor.execute(statement)
-            cursor.execute("commit")
+            cursor.execute(pii_data_create_script)
+            for table, rows in pii_data_csv.items():
+                cursor.copy_expert(
+                    "COPY {} FROM STDIN WITH CSV".format(table), StringIO(rows)
+                )
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+    return params
 
-    for p in params:
-        db_conn, expected_schema = p
-        db_conn.close()
+
+@pytest.fixture(scope="session")
+def load_sqlite_data(temp_sqlite_db):
+    db_conn, path = sqlite_conn(temp_sqlite_db)
+    with closing(db_conn):
+        # One explicit transaction instead of one implicit commit per statement
+        db_conn.executescript("BEGIN;\n{};\nCOMMIT;".format(pii_data_load_script))
+
+    return temp_sqlite_db
+
+
+@pytest.fixture(scope="session")
+def load_mysql_data(db_pool):
+    params = db_pool("mysql")
+    try:
+        yield run_script(params, pii_data_load_script)
+    finally:
+        # A load that failed part way may have left some of the tables behind
+        run_script(params, pii_data_drop_script)
+
+
+@pytest.fixture(scope="session")
+def load_pg_data(db_pool):
+    params = db_pool("postgresql")
+    try:
+        yield load_postgresql(params)
+    finally:
+        # A load that failed part way may have left some of the tables behind
+        run_script(params, pii_data_drop_script)
+
+
+@pytest.fixture(scope="session")
+def load_all_data(load_sqlite_data, load_mysql_data, load_pg_data):
+    return [load_mysql_data, load_pg_data], load_sqlite_data
 
 
 @pytest.fixture(scope="module")
@@ -213,30 +390,53 @@ def setup_catalog_and_data(load_all_data, open_catalog_connection):
     params, sqlite_path = load_all_data
     catalog, conf = open_catalog_connection
     with catalog.managed_session:
-        catalog.add_source(
-            name="mysql",
-            source_type="mysql",
-            uri="127.0.0.1",
-            username="piiuser",
-            password="p11secret",
-            database="piidb",
-        )
-        catalog.add_source(
-            name="pg",
-            source_type="postgresql",
-            uri="127.0.0.1",
-            username="piiuser",
-            password="p11secret",
-            database="piidb",
-            cluster="public",
+        catalog.add_sources(
+            [
+                dict(
+                    name="mysql",
+                    source_type="mysql",
+                    uri="127.0.0.1",
+                    username="piiuser",
+                    password="p11secret",
+                    database="piidb",
+                ),
+                dict(
+                    name="pg",
+                    source_type="postgresql",
+                    uri="127.0.0.1",
+                    username="piiuser",
+                    password="p11secret",
+                    database="piidb",
+                    cluster="public",
+                ),
+                dict(name="sqlite_db", source_type="sqlite", uri=sqlite_path),
+            ]
         )
-        catalog.add_source(name="sqlite_db", source_type="sqlite", uri=sqlite_path)
     yield catalog
     with catalog.managed_session as session:
-        [session.delete(db) for db in session.query(CatSource).all()]
-
-
-def source_pg(open_catalog_connection, request) -> Tuple[Catalog, str, int]:
+        # Delete only the sources added above and the objects scanned into them.
+        # Foreign keys do not cascade, so delete children before parents.
+        source_filter = CatSource.name.in_(["mysql", "pg", "sqlite_db"])
+        source_ids = session.query(CatSource.id).filter(source_filter)
+        schema_ids = session.query(CatSchema.id).filter(
+            CatSchema.source_id.in_(source_ids.subquery())
+        )
+        table_ids = session.query(CatTable.id).filter(
+            CatTable.schema_id.in_(schema_ids.subquery())
+        )
+        for model, criterion in [
+            (DefaultSchema, DefaultSchema.source_id.in_(source_ids.subquery())),
+            (CatColumn, CatColumn.table_id.in_(table_ids.subquery())),
+            (CatTable, CatTable.schema_id.in_(schema_ids.subquery())),
+            (CatSchema, CatSchema.source_id.in_(source_ids.subquery())),
+            (CatSource, source_filter),
+        ]:
+            session.query(model).filter(criterion).delete(synchronize_session=False)
+
+
+def source_pg(
+    open_catalog_connection, load_pg_data, request
+) -> Tuple[Catalog, str, int]:
     catalog, conf = open_catalog_connection
     host = request.config.getoption("--pg-host")
     with catalog.managed_session:
@@ -257,22 +457,11 @@ def source_pg(open_catalog_connection, request) -> Tuple[Catalog, str, int]:
     return catalog, conf, source_id
 
 
-@pytest.fixture(scope="module")
-def temp_sqlite(tmp_path_factory):
-    temp_dir = tmp_path_factory.mktemp("sqlite_test")
-    sqlite_path = temp_dir / "sqldb"
-
-    yield sqlite_path
-
-    rmtree(temp_dir)
-    logging.info("Deleted {}".format(str(temp_dir)))
-
-
 def source_sqlite(
-    open_catalog_connection, temp_sqlite
+    open_catalog_connection, load_sqlite_data
 ) -> Generator[Tuple[Catalog, str, int], None, None]:
     catalog, conf = open_catalog_connection
-    sqlite_path = temp_sqlite
+    sqlite_path = load_sqlite_data
     with catalog.managed_session:
         try:
             source = catalog.get_source("sqlite_src")
@@ -285,40 +474,15 @@ def source_sqlite(
 
 @fixture(scope="module")
 @parametrize_with_cases("source", scope="module", cases=".", prefix="source_")
-def create_source_engine(
-    source,
-) -> Generator[Tuple[Catalog, str, int, Any, str, str], None, None]:
+def load_data(source) -> Generator[Tuple[Catalog, str, int, str], None, None]:
+    # Sources point at the databases populated once per session by
+    # load_sqlite_data and load_pg_data
     catalog, conf, source_id = source
     with catalog.managed_session:
-        source = catalog.get_source_by_id(source_id)
-        name = source.name
-        conn_string = source.conn_string
-        source_type = source.source_type
-
-    engine = create_engine(conn_string)
-    yield catalog, conf, source_id, engine, name, source_type
-    engine.dispose()
-
-
-@pytest.fixture(scope="module")
-def load_data(
-    create_source_engine,
-) -> Generator[Tuple[Catalog, str, int, str], None, None]:
-    catalog, conf, source_id, engine, name, source_type = create_source_engine
-    with engine.begin() as conn:
-        for statement in pii_data_load:
-            conn.execute(statement)
-        if source_type != "sqlite":
-            conn.execute("commit")
+        name = catalog.get_source_by_id(source_id).name
 
     yield catalog, conf, source_id, name
 
-    with engine.begin() as conn:
-        for statement in pii_data_drop:
-            conn.execute(statement)
-        if source_type != "sqlite":
-            conn.execute("commit")
-
 
 @pytest.fixture(scope="module")
 def load_data_and_pull(load_data) -> Generator[Tuple[Catalog, str, int], None, None]:
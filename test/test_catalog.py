@@ -1,15 +1,20 @@
 import datetime
+import functools
+import json
 import logging
 import time
-from typing import Generator
+from contextlib import closing
+from typing import Dict, Generator
 
 import pytest
 import yaml
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 
 import dbcat.api
 from dbcat import settings
-from dbcat.api import init_db, open_catalog
+from dbcat.api import YAML_LOADER, init_db, open_catalog
 from dbcat.catalog.catalog import Catalog, SqliteCatalog
 from dbcat.catalog.models import (
     CatColumn,
@@ -26,6 +31,13 @@ from dbcat.catalog.pii_types import PiiType
 logger = logging.getLogger("dbcat.test")
 
 
+@functools.lru_cache(maxsize=None)
+def load_json(path: str):
+    # save_catalog runs once per catalog backend; parse the file only once
+    with open(path, "r") as file:
+        return json.load(file)
+
+
 class File:
     def __init__(self, name: str, path: str, catalog: Catalog):
         self.name = name
@@ -37,18 +49,16 @@ class File:
         return self._path
 
     def scan(self):
-        import json
-
-        with open(self.path, "r") as file:
-            content = json.load(file)
+        content = load_json(self.path)
 
-        with self._catalog.managed_session:
+        with self._catalog.managed_session as session:
             try:
                 source = self._catalog.get_source(content["name"])
             except NoResultFound:
                 source = self._catalog.add_source(
                     name=content["name"], source_type=content["source_type"]
                 )
+            column_rows = []
             for s in content["schemata"]:
                 try:
                     schema = self._catalog.get_schema(
@@ -57,48 +67,63 @@ class File:
                 except NoResultFound:
                     schema = self._catalog.add_schema(s["name"], source=source)
 
+                # Insert the schema's missing tables in one batch and read
+                # back the ids of all its tables in one query
+                table_ids = self._get_table_ids(session, schema)
+                session.bulk_insert_mappings(
+                    CatTable,
+                    [
+                        {"name": t["name"], "schema_id": schema.id}
+                        for t in s["tables"]
+                        if t["name"] not in table_ids
+                    ],
+                )
+                table_ids = self._get_table_ids(session, schema)
+                existing_columns = set(
+                    session.query(CatColumn.table_id, CatColumn.name)
+                    .join(CatColumn.table)
+                    .filter(CatTable.schema_id == schema.id)
+                )
+
                 for t in s["tables"]:
-                    try:
-                        table = self._catalog.get_table(
-                            source_name=source.name,
-                            schema_name=schema.name,
-                            table_name=t["name"],
-                        )
-                    except NoResultFound:
-                        table = self._catalog.add_table(t["name"], schema)
-
-                    index = 0
-                    for c in t["columns"]:
-                        try:
-                            self._catalog.get_column(
-                                source_name=source.name,
-                                schema_name=schema.name,
-                                table_name=table.name,
-                                column_name=c["name"],
-                            )
-                        except NoResultFound:
-                            self._catalog.add_column(
-                                column_name=c["name"],
-                                data_type=c["data_type"],
-                                sort_order=index,
-                                table=table,
+                    table_id = table_ids[t["name"]]
+                    for index, c in enumerate(t["columns"]):
+                        if (table_id, c["name"]) not in existing_columns:
+                            column_rows.append(
+                                {
+                                    "name": c["name"],
+                                    "data_type": c["data_type"],
+                                    "sort_order": index,
+                                    "table_id": table_id,
+                                }
                             )
-                        index += 1
+
+            # Insert the columns of every table in one batch
+            session.bulk_insert_mappings(CatColumn, column_rows)
+
+    @staticmethod
+    def _get_table_ids(session, schema: CatSchema) -> Dict[str, int]:
+        return dict(
+            session.query(CatTable.name, CatTable.id).filter(
+                CatTable.schema_id == schema.id
+            )
+        )
 
 
 @pytest.fixture(scope="module")
-def save_catalog(open_catalog_connection):
+def save_catalog(open_catalog_connection, bind_catalog):
     catalog, conf = open_catalog_connection
-    scanner = File("test", "test/catalog.json", catalog)
-    scanner.scan()
-    yield catalog
-    logging.debug("Deleting catalog loaded from file.")
-    with catalog.managed_session as session:
-        [session.delete(db) for db in session.query(CatSource).all()]
-        [session.delete(schema) for schema in session.query(CatSchema).all()]
-        [session.delete(table) for table in session.query(CatTable).all()]
-        [session.delete(col) for col in session.query(CatColumn).all()]
-        session.commit()
+    # Run every catalog session of the module inside one outer transaction.
+    # Session commits only end subtransactions and teardown is a single ROLLBACK.
+    connection = catalog.engine.connect()
+    transaction = connection.begin()
+    with bind_catalog(catalog, connection):
+        scanner = File("test", "test/catalog.json", catalog)
+        scanner.scan()
+        yield catalog
+    logging.debug("Rolling back catalog loaded from file.")
+    transaction.rollback()
+    connection.close()
 
 
 def test_catalog_config(root_connection, request):
@@ -118,78 +143,74 @@ def test_sqlalchemy_root(root_connection):
 def test_catalog_tables(open_catalog_connection):
     catalog, conf = open_catalog_connection
     with catalog.managed_session as session:
-        assert len(session.query(CatSource).all()) == 0
-        assert len(session.query(CatSchema).all()) == 0
-        assert len(session.query(CatTable).all()) == 0
-        assert len(session.query(CatColumn).all()) == 0
+        counts = session.execute(
+            union_all(
+                *[
+                    select([func.count()]).select_from(model.__table__)
+                    for model in [CatSource, CatSchema, CatTable, CatColumn]
+                ]
+            )
+        ).fetchall()
+        assert [count for (count,) in counts] == [0, 0, 0, 0]
 
 
-def test_read_catalog(save_catalog):
+def test_read_catalog(save_catalog, count_queries):
     catalog = save_catalog
 
     with catalog.managed_session as session:
-        dbs = session.query(CatSource).all()
-        assert len(dbs) == 1
-        db = dbs[0]
-        assert db.name == "test"
-        assert db.created_at is not None
-        assert db.updated_at is not None
-
-        assert len(db.schemata) == 1
-        schema = db.schemata[0]
-        assert schema.created_at is not None
-        assert schema.updated_at is not None
-
-        assert schema.name == "default"
-        assert len(schema.tables) == 8
-
-        tables = (
-            session.query(CatTable)
-            .filter(CatTable.name == "normalized_pagecounts")
-            .all()
-        )
-        assert len(tables) == 1
-        table = tables[0]
-        assert table is not None
-        assert table.name == "normalized_pagecounts"
-        assert table.created_at is not None
-        assert table.updated_at is not None
-        assert len(table.columns) == 5
-
-        page_id_column = table.columns[0]
-        assert page_id_column.name == "page_id"
-        assert page_id_column.data_type == "BIGINT"
-        assert page_id_column.sort_order == 0
-        assert page_id_column.created_at is not None
-        assert page_id_column.updated_at is not None
-
-        page_title_column = table.columns[1]
-        assert page_title_column.name == "page_title"
-        assert page_title_column.data_type == "STRING"
-        assert page_title_column.sort_order == 1
-        assert page_title_column.created_at is not None
-        assert page_title_column.updated_at is not None
-
-        page_url_column = table.columns[2]
-        assert page_url_column.name == "page_url"
-        assert page_url_column.data_type == "STRING"
-        assert page_url_column.sort_order == 2
-        assert page_url_column.created_at is not None
-        assert page_url_column.updated_at is not None
-
-        views_column = table.columns[3]
-        assert views_column.name == "views"
-        assert views_column.data_type == "BIGINT"
-        assert views_column.sort_order == 3
-        assert views_column.created_at is not None
-        assert views_column.updated_at is not None
-
-        bytes_sent_column = table.columns[4]
-        assert bytes_sent_column.name == "bytes_sent"
-        assert bytes_sent_column.data_type == "BIGINT"
-        assert bytes_sent_column.sort_order == 4
-        assert bytes_sent_column.created_at is not None
-        assert bytes_sent_column.updated_at is not None
+        with count_queries(session) as statements:
+            dbs = (
+                session.query(CatSource)
+                .options(
+                    selectinload(CatSource.schemata)
+                    .selectinload(CatSchema.tables)
+                    .selectinload(CatTable.columns),
+                    raiseload("*"),
+                )
+                .all()
+            )
+            assert len(dbs) == 1
+            db = dbs[0]
+            assert db.name == "test"
+            assert db.created_at is not None
+            assert db.updated_at is not None
+
+            assert len(db.schemata) == 1
+            schema = db.schemata[0]
+            assert schema.created_at is not None
+            assert schema.updated_at is not None
+
+            assert schema.name == "default"
+            assert len(schema.tables) == 8
+
+            tables = (
+                session.query(CatTable)
+                .options(selectinload(CatTable.columns), raiseload("*"))
+                .filter(CatTable.name == "normalized_pagecounts")
+                .all()
+            )
+            assert len(tables) == 1
+            table = tables[0]
+            assert table is not None
+            assert table.name == "normalized_pagecounts"
+            assert table.created_at is not None
+            assert table.updated_at is not None
+            assert len(table.columns) == 5
+
+            expected_columns = [
+                ("page_id", "BIGINT", 0),
+                ("page_title", "STRING", 1),
+                ("page_url", "STRING", 2),
+                ("views", "BIGINT", 3),
+                ("bytes_sent", "BIGINT", 4),
+            ]
+            for column, expected in zip(table.columns, expected_columns):
+                assert (column.name, column.data_type, column.sort_order) == expected
+                assert column.created_at is not None
+                assert column.updated_at is not None
+
+        # One query per level of the eager loaded source and table lookups
+        assert len(statements) <= 6
 
 
 @pytest.mark.skip
@@ -317,6 +338,18 @@ def test_get_column(managed_session):
     assert column.fqdn == ("test", "default", "page", "page_title")
 
 
+def test_get_columns(managed_session):
+    catalog = managed_session
+    fqdns = [
+        ("test", "default", "page", "page_title"),
+        ("test", "default", "page", "page_id"),
+        ("test", "default", "page", "no_such_column"),
+    ]
+    columns = catalog.get_columns(fqdns)
+    assert set(columns.keys()) == set(fqdns[:2])
+    assert columns[fqdns[0]].fqdn == fqdns[0]
+
+
 def test_get_column_by_id(managed_session):
     catalog = managed_session
     column = catalog.get_column("test", "default", "page", "page_title")
@@ -435,14 +468,34 @@ def test_update_column_pii_type(managed_session):
     assert updated_column.updated_at >= updated_column.created_at
 
 
+def test_bind_catalog(tmp_path, bind_catalog):
+    # A catalog of its own, so that the test does not wait on the locks of the
+    # transaction that save_catalog holds open for the module
+    with closing(SqliteCatalog(path=str(tmp_path / "bind.db"))) as catalog:
+        init_db(catalog)
+        scoped_session = catalog.get_scoped_session()
+        connection = catalog.engine.connect()
+        transaction = connection.begin()
+        with bind_catalog(catalog, connection):
+            with catalog.managed_session:
+                catalog.add_source(name="bound", source_type="sqlite", uri="bound.db")
+            with catalog.managed_session:
+                assert len(catalog.search_sources(source_like="bound")) == 1
+        transaction.rollback()
+        connection.close()
+
+        assert catalog.get_scoped_session() is scoped_session
+        with catalog.managed_session:
+            assert len(catalog.search_sources(source_like="bound")) == 0
+
+
 def test_add_sources(open_catalog_connection):
     catalog, conf = open_catalog_connection
     with open("test/connections.yaml") as f:
-        connections = yaml.safe_load(f)
+        connections = yaml.load(f, Loader=YAML_LOADER)
 
     with catalog.managed_session:
-        for c in connections["connections"]:
-            catalog.add_source(**c)
+        catalog.add_sources(connections["connections"])
 
         connections = catalog.search_sources(source_like="%")
         assert len(connections) == 8
@@ -515,7 +568,7 @@ def test_add_sources(open_catalog_connection):
 @pytest.fixture(scope="module")
 def load_job_and_executions(save_catalog):
     catalog = save_catalog
-    with catalog.managed_session:
+    with catalog.managed_session as session:
         source = catalog.get_source("test")
         job = catalog.add_job(
             "insert_page_lookup_redirect",
@@ -524,38 +577,44 @@ def load_job_and_executions(save_catalog):
                 "sql": "insert into page_lookup_redirect(page_id, page_version) select page_idm, page_latest from page"
             },
         )
-        e1 = catalog.add_job_execution(
-            job=job,
-            started_at=datetime.datetime.combine(
-                datetime.date(2021, 4, 1), datetime.time(1, 0)
-            ),
-            ended_at=datetime.datetime.combine(
-                datetime.date(2021, 4, 1), datetime.time(1, 15)
-            ),
-            status=JobExecutionStatus.SUCCESS,
-        )
-        e2 = catalog.add_job_execution(
-            job=job,
-            started_at=datetime.datetime.combine(
-                datetime.date(2021, 4, 1), datetime.time(2, 0)
-            ),
-            ended_at=datetime.datetime.combine(
-                datetime.date(2021, 4, 1), datetime.time(2, 15)
-            ),
-            status=JobExecutionStatus.FAILURE,
-        )
-        e3 = catalog.add_job_execution(
-            job=job,
-            started_at=datetime.datetime.combine(
-                datetime.date(2021, 5, 1), datetime.time(1, 0)
-            ),
-            ended_at=datetime.datetime.combine(
-                datetime.date(2021, 5, 1), datetime.time(1, 15)
-            ),
-            status=JobExecutionStatus.SUCCESS,
+        session.bulk_insert_mappings(
+            JobExecution,
+            [
+                {
+                    "job_id": job.id,
+                    "started_at": datetime.datetime.combine(day, start),
+                    "ended_at": datetime.datetime.combine(day, end),
+                    "status": status,
+                }
+                for day, start, end, status in [
+                    (
+                        datetime.date(2021, 4, 1),
+                        datetime.time(1, 0),
+                        datetime.time(1, 15),
+                        JobExecutionStatus.SUCCESS,
+                    ),
+                    (
+                        datetime.date(2021, 4, 1),
+                        datetime.time(2, 0),
+                        datetime.time(2, 15),
+                        JobExecutionStatus.FAILURE,
+                    ),
+                    (
+                        datetime.date(2021, 5, 1),
+                        datetime.time(1, 0),
+                        datetime.time(1, 15),
+                        JobExecutionStatus.SUCCESS,
+                    ),
+                ]
+            ],
         )
         name = job.name
-        executions = [e1.id, e2.id, e3.id]
+        executions = [
+            execution_id
+            for (execution_id,) in session.query(JobExecution.id)
+            .filter(JobExecution.job_id == job.id)
+            .order_by(JobExecution.started_at)
+        ]
 
         print("Inserted job {}".format(name))
         print("Inserted executions {}".format(",".join(str(v) for v in executions)))
@@ -614,28 +673,23 @@ def test_get_latest_job_execution(load_job_and_executions):
 
 
 def load_edges(catalog, expected_edges, job_execution_id):
-    column_edge_ids = []
-    with catalog.managed_session:
-        for edge in expected_edges:
-            source = catalog.get_column(
-                source_name=edge[0][0],
-                schema_name=edge[0][1],
-                table_name=edge[0][2],
-                column_name=edge[0][3],
-            )
-
-            target = catalog.get_column(
-                source_name=edge[1][0],
-                schema_name=edge[1][1],
-                table_name=edge[1][2],
-                column_name=edge[1][3],
-            )
-
-            added_edge = catalog.add_column_lineage(
-                source, target, job_execution_id, {}
+    with catalog.managed_session as session:
+        columns = catalog.get_columns(fqdn for edge in expected_edges for fqdn in edge)
+
+        catalog.add_column_lineages(
+            [
+                (columns[source_fqdn], columns[target_fqdn], {})
+                for source_fqdn, target_fqdn in expected_edges
+            ],
+            job_execution_id,
+        )
+        # Each fixture loads the edges of a job execution exactly once
+        column_edge_ids = [
+            edge_id
+            for (edge_id,) in session.query(ColumnLineage.id).filter(
+                ColumnLineage.job_execution_id == job_execution_id
             )
-
-            column_edge_ids.append(added_edge.id)
+        ]
     return column_edge_ids
 
 
@@ -713,10 +767,8 @@ def load_page_lookup_nonredirect_edges(save_catalog):
         session.commit()
 
 
-@pytest.fixture(scope="module")
-def insert_page_lookup_redirect(load_job_and_executions):
-    catalog, name, executions = load_job_and_executions
-    expected_edges = [
+page_lookup_redirect_edges = frozenset(
+    [
         (
             ("test", "default", "page", "page_id"),
             ("test", "default", "page_lookup_redirect", "page_id"),
@@ -726,11 +778,17 @@ def insert_page_lookup_redirect(load_job_and_executions):
             ("test", "default", "page_lookup_redirect", "page_version"),
         ),
     ]
+)
+
 
-    column_edge_ids = load_edges(catalog, expected_edges, executions[2])
+@pytest.fixture(scope="module")
+def insert_page_lookup_redirect(load_job_and_executions):
+    catalog, name, executions = load_job_and_executions
+
+    column_edge_ids = load_edges(catalog, page_lookup_redirect_edges, executions[2])
     print("Inserted edges {}".format(",".join(str(v) for v in column_edge_ids)))
 
-    yield catalog, expected_edges
+    yield catalog, page_lookup_redirect_edges
 
     with catalog.managed_session as session:
         session.query(ColumnLineage).filter(
@@ -743,10 +801,26 @@ def insert_page_lookup_redirect(load_job_and_executions):
 def test_add_edge(insert_page_lookup_redirect):
     catalog, expected_edges = insert_page_lookup_redirect
     with catalog.managed_session as session:
-        all_edges = session.query(ColumnLineage).all()
-        assert set([(e.source.fqdn, e.target.fqdn) for e in all_edges]) == set(
-            expected_edges
+        all_edges = (
+            session.query(ColumnLineage)
+            .options(
+                *[
+                    # fqdn only reads the names along the path to the source
+                    joinedload(edge_column)
+                    .load_only("name")
+                    .joinedload(CatColumn.table)
+                    .load_only("name")
+                    .joinedload(CatTable.schema)
+                    .load_only("name")
+                    .joinedload(CatSchema.source)
+                    .load_only("name")
+                    for edge_column in [ColumnLineage.source, ColumnLineage.target]
+                ],
+                raiseload("*"),
+            )
+            .all()
         )
+        assert {(e.source.fqdn, e.target.fqdn) for e in all_edges} == expected_edges
 
 
 def test_get_all_edges(load_page_lookup_nonredirect_edges, insert_page_lookup_redirect):
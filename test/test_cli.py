@@ -5,31 +5,26 @@ import yaml
 from typer.testing import CliRunner
 
 from dbcat.__main__ import app
-from dbcat.catalog import CatSource
+from dbcat.api import YAML_LOADER
+from dbcat.catalog import CatColumn, CatSchema, CatSource, CatTable
+from dbcat.catalog.models import DefaultSchema
 
+# The sources that config_path adds are named after this module
+SOURCE_SUFFIX = "test_cli"
 
-def run_asserts(catalog, connection_name):
-    with catalog.managed_session:
-        pg_source = catalog.get_source(connection_name)
-        assert pg_source is not None
 
-        pg_schemata = pg_source.schemata
-        assert len(pg_schemata) == 1
+@pytest.fixture(scope="module")
+def cli_runner():
+    return CliRunner()
 
-        pg_tables = pg_schemata[0].tables
-        assert len(pg_tables) == 3
 
-        pg_columns = []
-        for table in pg_tables:
-            pg_columns = pg_columns + table.columns
-        assert len(pg_columns) == 6
-
-
-@pytest.fixture
-def config_path(request, load_all_data, open_catalog_connection):
+@pytest.fixture(scope="module")
+def config_path(cli_runner, load_all_data, open_catalog_connection):
+    # Sources are added once for the module. Scans are idempotent, so every
+    # test can scan them again and see the same catalog.
     catalog, conf = open_catalog_connection
 
-    config = yaml.safe_load(conf)
+    config = yaml.load(conf, Loader=YAML_LOADER)
     config_params = []
 
     for key, value in config["catalog"].items():
@@ -47,49 +42,62 @@ def config_path(request, load_all_data, open_catalog_connection):
         "127.0.0.1",
     ]
 
-    runner = CliRunner()
+    runner = cli_runner
     for type in ["add-mysql", "add-postgresql"]:
         result = runner.invoke(
             app,
             config_params
-            + ["catalog", type, "--name", "{}_{}".format(type, request.node.name)]
+            + ["catalog", type, "--name", "{}_{}".format(type, SOURCE_SUFFIX)]
             + source_params,
+            catch_exceptions=False,
         )
-        print(result.stdout)
-        assert result.exit_code == 0
+        assert result.exit_code == 0, result.output
 
-    yield catalog, config_params, request.node.name
+    yield catalog, config_params, SOURCE_SUFFIX
 
     with catalog.managed_session as session:
         logging.debug("Starting clean up of catalog")
-        [
-            session.delete(db)
-            for db in session.query(CatSource)
-            .filter(CatSource.name.like("%{}%".format(request.node.name)))
-            .all()
-        ]
+        # Foreign keys do not cascade, so delete children before parents
+        source_filter = CatSource.name.like("%{}%".format(SOURCE_SUFFIX))
+        source_ids = session.query(CatSource.id).filter(source_filter)
+        schema_ids = session.query(CatSchema.id).filter(
+            CatSchema.source_id.in_(source_ids.subquery())
+        )
+        table_ids = session.query(CatTable.id).filter(
+            CatTable.schema_id.in_(schema_ids.subquery())
+        )
+        for model, criterion in [
+            (CatColumn, CatColumn.table_id.in_(table_ids.subquery())),
+            (CatTable, CatTable.schema_id.in_(schema_ids.subquery())),
+            (DefaultSchema, DefaultSchema.source_id.in_(source_ids.subquery())),
+            (CatSchema, CatSchema.source_id.in_(source_ids.subquery())),
+            (CatSource, source_filter),
+        ]:
+            session.query(model).filter(criterion).delete(synchronize_session=False)
 
 
-def test_cli_all(config_path):
+def test_cli_all(config_path, cli_runner, run_asserts):
     catalog, config_params, suffix = config_path
 
-    runner = CliRunner()
-    result = runner.invoke(app, config_params + ["catalog", "scan"])
-    print(result.stdout)
-    assert result.exit_code == 0
+    runner = cli_runner
+    result = runner.invoke(
+        app, config_params + ["catalog", "scan"], catch_exceptions=False
+    )
+    assert result.exit_code == 0, result.output
     run_asserts(catalog, "add-postgresql_{}".format(suffix))
     run_asserts(catalog, "add-mysql_{}".format(suffix))
 
 
 @pytest.mark.parametrize("source", ["add-postgresql", "add-mysql"])
-def test_cli_connection(config_path, source):
+def test_cli_connection(config_path, cli_runner, run_asserts, source):
     catalog, config_params, suffix = config_path
     connection_name = "{}_{}".format(source, suffix)
 
-    runner = CliRunner()
+    runner = cli_runner
     result = runner.invoke(
-        app, config_params + ["catalog", "scan", "--source-name", connection_name],
+        app,
+        config_params + ["catalog", "scan", "--source-name", connection_name],
+        catch_exceptions=False,
     )
-    print(result.stdout)
-    assert result.exit_code == 0
+    assert result.exit_code == 0, result.output
     run_asserts(catalog, connection_name)
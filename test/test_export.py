@@ -1,22 +1,35 @@
+import pytest
 import yaml
 from databuilder import Scoped
 from datahub.ingestion.api.common import PipelineContext
 from pyhocon import ConfigFactory
 
 from dbcat.amundsen import CatalogExtractor
+from dbcat.api import YAML_LOADER
 from dbcat.datahub import CatalogSource
 
 
-def test_simple_amundsen_extract(load_source):
+@pytest.fixture(scope="module")
+def export_config(load_source):
     catalog, conf, source = load_source
-    catalog_config = ConfigFactory.from_dict(yaml.safe_load(conf)["catalog"])
-    config = ConfigFactory.from_dict(
+    return yaml.load(conf, Loader=YAML_LOADER)["catalog"], source
+
+
+@pytest.fixture(scope="module")
+def amundsen_config(export_config):
+    # The extractor only reads its config, so one tree serves the whole module
+    config_dict, source = export_config
+    catalog_config = ConfigFactory.from_dict(config_dict)
+    return ConfigFactory.from_dict(
         {
             f"tokern.catalog.{CatalogExtractor.CATALOG_CONFIG}": catalog_config,
             "tokern.catalog.source_names": [source.name],
         }
     )
 
+
+def test_simple_amundsen_extract(amundsen_config):
+    config = amundsen_config
     extractor = CatalogExtractor()
     extractor.init(Scoped.get_scoped_conf(config, extractor.get_scope()))
 
@@ -26,10 +39,10 @@ def test_simple_amundsen_extract(load_source):
     assert num_tables == 3
 
 
-def test_simple_datahub_extract(load_source):
-    catalog, conf, source = load_source
+def test_simple_datahub_extract(export_config):
+    config_dict, source = export_config
     datahub_source = CatalogSource.create(
-        yaml.safe_load(conf)["catalog"], PipelineContext(run_id="test_extract")
+        config_dict, PipelineContext(run_id="test_extract")
     )
     datahub_source.config.source_names = [source.name]
 
@@ -98,8 +98,8 @@ def test_athena_extractor_iam(open_catalog_connection):
         )
 
 
-def test_sqlite_extractor(load_all_data):
-    params, path = load_all_data
+def test_sqlite_extractor(load_sqlite_data):
+    path = load_sqlite_data
     conn_string_key = f"{SqliteMetadataExtractor().get_scope()}.{SQLAlchemyExtractor().get_scope()}.{SQLAlchemyExtractor.CONN_STRING}"
     config = ConfigFactory.from_dict(
         {conn_string_key: "sqlite:///{path}".format(path=path)}
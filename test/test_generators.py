@@ -1,13 +1,41 @@
-from dbcat.generators import CatalogObject, filter_objects
+import re
 
+import pytest
 
-def test_simple_schema_include(load_source):
+from dbcat.generators import (
+    CatalogObject,
+    _compile_regex,
+    _optimize_alternation,
+    filter_objects,
+    to_catalog_objects,
+)
+
+
+# The filters do not change the catalog, so the objects are searched once per
+# source instead of once per test.
+@pytest.fixture(scope="module")
+def schema_objects(load_source):
     catalog, conf, source = load_source
-    schema_objects = [
-        CatalogObject(s.name, s.id)
-        for s in catalog.search_schema(source_like=source.name, schema_like="%")
-    ]
+    return list(
+        to_catalog_objects(
+            catalog.search_schema(source_like=source.name, schema_like="%")
+        )
+    )
+
+
+@pytest.fixture(scope="module")
+def table_objects(load_source):
+    catalog, conf, source = load_source
+    return list(
+        to_catalog_objects(
+            catalog.search_tables(
+                source_like=source.name, schema_like="%", table_like="%"
+            )
+        )
+    )
+
 
+def test_simple_schema_include(schema_objects):
     filtered = filter_objects(
         include_regex_str=[schema_objects[0].name],
         exclude_regex_str=None,
@@ -16,13 +44,7 @@ def test_simple_schema_include(load_source):
     assert len(filtered) == 1
 
 
-def test_simple_schema_exclude(load_source):
-    catalog, conf, source = load_source
-    schema_objects = [
-        CatalogObject(s.name, s.id)
-        for s in catalog.search_schema(source_like=source.name, schema_like="%")
-    ]
-
+def test_simple_schema_exclude(schema_objects):
     filtered = filter_objects(
         exclude_regex_str=[schema_objects[0].name],
         include_regex_str=None,
@@ -31,13 +53,7 @@ def test_simple_schema_exclude(load_source):
     assert len(filtered) == 0
 
 
-def test_simple_schema_include_exclude(load_source):
-    catalog, conf, source = load_source
-    schema_objects = [
-        CatalogObject(s.name, s.id)
-        for s in catalog.search_schema(source_like=source.name, schema_like="%")
-    ]
-
+def test_simple_schema_include_exclude(schema_objects):
     filtered = filter_objects(
         include_regex_str=[schema_objects[0].name],
         exclude_regex_str=[schema_objects[0].name],
@@ -46,88 +62,45 @@ def test_simple_schema_include_exclude(load_source):
     assert len(filtered) == 0
 
 
-def test_regex_schema_include(load_source):
-    catalog, conf, source = load_source
-    schema_objects = [
-        CatalogObject(s.name, s.id)
-        for s in catalog.search_schema(source_like=source.name, schema_like="%")
-    ]
-
+def test_regex_schema_include(schema_objects):
     filtered = filter_objects(
         include_regex_str=[".*"], exclude_regex_str=None, objects=schema_objects
     )
     assert len(filtered) == 1
 
 
-def test_regex_schema_exclude(load_source):
-    catalog, conf, source = load_source
-    schema_objects = [
-        CatalogObject(s.name, s.id)
-        for s in catalog.search_schema(source_like=source.name, schema_like="%")
-    ]
-
+def test_regex_schema_exclude(schema_objects):
     filtered = filter_objects(
         exclude_regex_str=[".*"], include_regex_str=None, objects=schema_objects
     )
     assert len(filtered) == 0
 
 
-def test_regex_failed_schema_include(load_source):
-    catalog, conf, source = load_source
-    schema_objects = [
-        CatalogObject(s.name, s.id)
-        for s in catalog.search_schema(source_like=source.name, schema_like="%")
-    ]
-
+def test_regex_failed_schema_include(schema_objects):
     filtered = filter_objects(
         include_regex_str=["fail.*"], exclude_regex_str=None, objects=schema_objects
     )
     assert len(filtered) == 0
 
 
-def test_regex_failed_schema_exclude(load_source):
-    catalog, conf, source = load_source
-    schema_objects = [
-        CatalogObject(s.name, s.id)
-        for s in catalog.search_schema(source_like=source.name, schema_like="%")
-    ]
-
+def test_regex_failed_schema_exclude(schema_objects):
     filtered = filter_objects(
         exclude_regex_str=["fail.*"], include_regex_str=None, objects=schema_objects
     )
     assert len(filtered) == 1
 
 
-def test_regex_success_table_include(load_source):
-    catalog, conf, source = load_source
-    table_objects = [
-        CatalogObject(t.name, t.id)
-        for t in catalog.search_tables(
-            source_like=source.name, schema_like="%", table_like="%"
-        )
-    ]
-
+def test_regex_success_table_include(table_objects):
     filtered = filter_objects(
         include_regex_str=["full.*", "partial.*"],
         exclude_regex_str=None,
         objects=table_objects,
     )
     assert len(filtered) == 2
-    assert sorted([c.name for c in filtered]) == [
-        "full_pii",
-        "partial_pii",
-    ]
+    assert {c.name for c in filtered} == {"full_pii", "partial_pii"}
 
 
-def test_regex_success_table_exclude(load_source):
-    catalog, conf, source = load_source
-    table_objects = [
-        CatalogObject(t.name, t.id)
-        for t in catalog.search_tables(
-            source_like=source.name, schema_like="%", table_like="%"
-        )
-    ]
-
+def test_regex_success_table_exclude(table_objects):
     filtered = filter_objects(
         exclude_regex_str=["full.*", "partial.*"],
         include_regex_str=None,
@@ -137,19 +110,156 @@ def test_regex_success_table_exclude(load_source):
     assert [c.name for c in filtered] == ["no_pii"]
 
 
-def test_regex_success_table_include_exclude(load_source):
-    catalog, conf, source = load_source
-    table_objects = [
-        CatalogObject(t.name, t.id)
-        for t in catalog.search_tables(
-            source_like=source.name, schema_like="%", table_like="%"
-        )
-    ]
-
+def test_regex_success_table_include_exclude(table_objects):
     filtered = filter_objects(
         include_regex_str=["full.*", "partial.*"],
         exclude_regex_str=["full.*"],
         objects=table_objects,
     )
     assert len(filtered) == 1
-    assert sorted([c.name for c in filtered]) == ["partial_pii"]
+    assert {c.name for c in filtered} == {"partial_pii"}
+
+
+def search_each(include_regex_str, exclude_regex_str, names):
+    """Reference filter that searches with every pattern separately"""
+    return [
+        name
+        for name in names
+        if (
+            not include_regex_str
+            or any(re.search(exp, name, re.IGNORECASE) for exp in include_regex_str)
+        )
+        and not (
+            exclude_regex_str
+            and any(re.search(exp, name, re.IGNORECASE) for exp in exclude_regex_str)
+        )
+    ]
+
+
+def filter_names(include_regex_str, exclude_regex_str, names):
+    objects = [CatalogObject(name, index) for index, name in enumerate(names)]
+    return [
+        o.name for o in filter_objects(include_regex_str, exclude_regex_str, objects)
+    ]
+
+
+@pytest.mark.parametrize(
+    "include_regex_str,exclude_regex_str,names",
+    [
+        (["(?x)a b", "c d"], None, ["ab", "a b", "cd", "c d"]),
+        (["c d", "(?x)a b"], None, ["ab", "a b", "cd", "c d"]),
+        (None, ["(?s)a.b", "c.d"], ["a\nb", "c\nd", "cxd"]),
+        (["(?m)^b", "a$"], None, ["a\nb", "ba", "xa\n"]),
+        (["(a)\\1", "b"], None, ["aa", "ab", "b", "c"]),
+    ],
+)
+def test_unfused_patterns(include_regex_str, exclude_regex_str, names):
+    # Inline global flags and groups would leak into the other patterns if the
+    # patterns were joined, so each pattern is searched on its own.
+    for expressions in (include_regex_str, exclude_regex_str):
+        if expressions:
+            assert len(_compile_regex(tuple(expressions))) == len(expressions)
+    assert filter_names(include_regex_str, exclude_regex_str, names) == search_each(
+        include_regex_str, exclude_regex_str, names
+    )
+
+
+def test_inline_flag_stays_in_its_pattern():
+    assert filter_names(["(?x)a b", "c d"], None, ["ab", "a b", "cd", "c d"]) == [
+        "ab",
+        "c d",
+    ]
+
+
+ALTERNATION_NAMES = [
+    "full_pii",
+    "full_name",
+    "FULL_X",
+    "full",
+    "ful",
+    "fu",
+    "partial_pii",
+    "abbbc",
+    "ac",
+    "abc",
+    "a.c",
+    "xfull_pii",
+]
+
+
+@pytest.mark.parametrize(
+    "expressions",
+    [
+        # Shared prefixes
+        ["full_pii.*", "full_name", "partial.*"],
+        ["full_pii", "FULL_name", "fu"],
+        # An empty remainder next to longer patterns
+        ["full", "full_pii", "full_n.*"],
+        # A pattern that is only the shared prefix
+        ["ful", "full_.*"],
+        # Metacharacters right after the prefix
+        ["ab*c", "abc"],
+        ["ab+c", "a.c"],
+        ["ab?c", "ab{3}c", "a[.]c"],
+        ["^full", "full$", "full_pii"],
+    ],
+)
+def test_optimize_alternation(expressions):
+    assert len(_compile_regex(tuple(expressions))) == 1
+    for include, exclude in ((expressions, None), (None, expressions)):
+        assert filter_names(include, exclude, ALTERNATION_NAMES) == search_each(
+            include, exclude, ALTERNATION_NAMES
+        )
+
+
+def test_optimize_alternation_shares_prefix():
+    assert (
+        _optimize_alternation(("full_pii.*", "FULL_name", "partial.*"))
+        == "(?:full_(?:name|pii.*)|partial.*)"
+    )
+    # The quantifier binds to the last literal character, which is not shared
+    assert _optimize_alternation(("ab*c", "abc")) == "a(?:b*c|bc)"
+
+
+LITERAL_NAMES = [
+    "full_pii",
+    "FULL_PII",
+    "partial_pii",
+    "no_pii",
+    "pii",
+    "xfullx",
+    "ſchema",
+    "İd",
+    "Kind",
+    "ſ_full",
+]
+
+
+@pytest.mark.parametrize(
+    "expressions",
+    [
+        # Only literals, matched as case insensitive substrings
+        ["full"],
+        ["FULL_pii", "no"],
+        ["pii"],
+        # Non-ASCII names that re.IGNORECASE folds differently from str.lower()
+        ["schema"],
+        ["id", "kind"],
+        ["s"],
+        # Literals mixed with regular expressions
+        ["full", "part.*"],
+        ["^no", "pii", "k.nd"],
+        ["(?x) s chema", "full"],
+    ],
+)
+def test_literal_patterns(expressions):
+    for include, exclude in ((expressions, None), (None, expressions)):
+        assert filter_names(include, exclude, LITERAL_NAMES) == search_each(
+            include, exclude, LITERAL_NAMES
+        )
+
+
+def test_literal_pattern_non_ascii_name():
+    # "ſ".lower() is "ſ", but re.IGNORECASE matches it with "s"
+    assert filter_names(["s"], None, ["ſ", "x"]) == ["ſ"]
+    assert filter_names(["kind"], None, ["Kind", "find"]) == ["Kind"]